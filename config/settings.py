@@ -4,6 +4,7 @@ This file contains all configurable parameters and paths.
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 from typing import Dict, List
 
@@ -26,14 +27,33 @@ SUPPORTED_COUNTRIES = list(COUNTRY_MAPPING.keys())
 ENCODING = "cp850"
 SEPARATOR = ";"
 
-# CSV reading parameters
+# Identifier and code columns read as text, so they are never parsed as
+# floats and stringified back with a ".0" suffix
+STRING_COLUMNS = [
+    "customer_id", "customer_reference", "invoice_number",
+    "order_number", "salutation"
+]
+
+# CSV reading parameters (PyArrow reader, see src.utils.data_processing.load_csv)
 CSV_READ_KWARGS = {
     "sep": SEPARATOR,
     "encoding": ENCODING,
-    "low_memory": False,
-    "dtype_backend": "numpy_nullable"
+    "block_size": 64 << 20,
+    "string_columns": STRING_COLUMNS
 }
 
+# Also write each CSV output as a Parquet file next to it
+WRITE_PARQUET = os.getenv("WRITE_PARQUET", "false").lower() in ("1", "true", "yes")
+PARQUET_COMPRESSION = "snappy"
+
+# Country pipeline stages run at once by the orchestration flows; each
+# stage holds its own inputs in memory, so this bounds peak memory
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "2"))
+
+# How long a per-country pipeline result is reused for a repeated run with
+# the same country, paths and unchanged source files
+TASK_CACHE_EXPIRATION = timedelta(hours=1)
+
 # Dask configuration
 DASK_CONFIG = {
     "blocksize": "64MB",
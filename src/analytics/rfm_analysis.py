@@ -5,20 +5,180 @@ This module implements RFM (Recency, Frequency, Monetary) analysis for customer
 It processes customer transaction data to create meaningful customer segments.
 """
 
+import os
 import pandas as pd
 import numpy as np
 from datetime import date, datetime
+from functools import lru_cache
 from dateutil.relativedelta import relativedelta
 from prefect import flow, task, get_run_logger
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
-from config.settings import RFM_CONFIG, CUSTOMER_SEGMENTS
+from config.settings import (
+    RFM_CONFIG, CUSTOMER_SEGMENTS, CSV_READ_KWARGS, WRITE_PARQUET, PARQUET_COMPRESSION
+)
 from src.utils.data_processing import (
-    pad_customer_id, get_half_year_reference_dates, 
-    create_customer_segments, validate_data_quality
+    load_csvs, save_parquet, pad_customer_id, extract_customer_id,
+    calculate_net_sales, get_half_year_reference_dates, create_customer_segments,
+    validate_data_quality
 )
 
 
+# Segment labels; customer_segment codes index into this list
+SEGMENT_NAMES = CUSTOMER_SEGMENTS + ["Unknown"]
+
+
+def _segment_for_scores(r: int, mf: int) -> str:
+    """
+    RFM segmentation logic for a single recency / monetary-frequency score pair.
+    
+    Args:
+        r: Recency score
+        mf: Combined monetary-frequency score
+        
+    Returns:
+        Segment label
+    """
+    if mf >= 4 and r >= 4:
+        return "01-Champions"
+    elif mf >= 4 and r in [2, 3]:
+        return "02-Treue Kunden"
+    elif mf == 5 and r <= 1:
+        return "03-Nicht zu verlieren"
+    elif mf in [2, 3] and r >= 3:
+        return "04-Potenziell loyale Kunden"
+    elif mf == 3 and r in [2, 3]:
+        return "05-Brauchen Aufmerksamkeit"
+    elif mf >= 3 and r <= 1:
+        return "06-Gefährdete Kunden"
+    elif mf == 1 and r >= 4:
+        return "08-Reaktivierte Kunden"
+    elif mf == 1 and r in [2, 3]:
+        return "09-Vielversprechende Kunden"
+    elif mf <= 2 and r in [2, 3]:
+        return "10-Abwandernde Kunden"
+    elif mf == 2 and r <= 1:
+        return "11-Schlafende Kunden"
+    elif mf == 1 and r <= 1:
+        return "12-Verlorene Kunden"
+    else:
+        return "Nicht klassifiziert"
+
+
+# Segment code for every score pair, indexed as SEGMENT_TABLE[r_score, mf_score]
+SEGMENT_TABLE = np.array(
+    [[SEGMENT_NAMES.index(_segment_for_scores(r, mf)) for mf in range(6)] for r in range(6)],
+    dtype=np.int8
+)
+
+
+# Recency score bins (days since last purchase); fewer days score higher
+RECENCY_BINS = np.array([0, 30, 90, 180, 365, np.inf])
+RECENCY_LABELS = np.array([5, 4, 3, 2, 1], dtype=np.int8)
+
+# Period codes used by calculate_rfm_metrics
+PERIOD_3TO5 = 1
+PERIOD_LAST2 = 2
+
+
+def _distinct_orders_by_code(
+    group_codes: np.ndarray,
+    order_codes: np.ndarray,
+    n_groups: int
+) -> np.ndarray:
+    """
+    Count distinct orders per group, like groupby "nunique".
+    
+    Args:
+        group_codes: Integer group code per row (-1 rows are ignored)
+        order_codes: Factorized order number per row (-1 for missing orders)
+        n_groups: Number of group codes
+        
+    Returns:
+        Array of int32 distinct order counts indexed by group code
+    """
+    valid = (group_codes >= 0) & (order_codes >= 0)
+    n_orders = int(order_codes.max()) + 1 if valid.any() else 1
+    # Hash the (group, order) pairs instead of sorting them
+    pairs = pd.unique(group_codes[valid].astype(np.int64) * n_orders + order_codes[valid])
+    return np.bincount(pairs // n_orders, minlength=n_groups).astype(np.int32)
+
+
+def _first_valid_by_code(codes: np.ndarray, values: pd.Series, n_groups: int) -> pd.api.extensions.ExtensionArray:
+    """
+    Take the first non-null value per group, like groupby "first".
+    
+    Works on row positions, so text columns are not aggregated as strings.
+    
+    Args:
+        codes: Integer group code per row
+        values: Values to pick from
+        n_groups: Number of group codes
+        
+    Returns:
+        Array with one value per group code, missing where a group has no value
+    """
+    valid = np.flatnonzero(values.notna().to_numpy())
+    first = pd.Series(valid).groupby(codes[valid], sort=False).min()
+    positions = np.full(n_groups, -1, dtype=np.intp)
+    positions[first.index.to_numpy()] = first.to_numpy()
+    return values.array.take(positions, allow_fill=True)
+
+
+def _bin_scores(
+    values: pd.Series,
+    bins: Sequence[float],
+    labels: Sequence[int],
+    right: bool = True
+) -> np.ndarray:
+    """
+    Map values to score labels by bin, like pd.cut with include_lowest=True.
+    
+    Args:
+        values: Values to score
+        bins: Ascending bin edges
+        labels: Score label for each bin
+        right: Whether bins include their right edge
+        
+    Returns:
+        Array of int8 scores
+    """
+    values = values.to_numpy(dtype=float, na_value=np.nan)
+    edges = np.asarray(bins, dtype=float)
+    
+    if right:
+        # (a, b] bins; the lowest edge belongs to the first bin
+        idx = np.searchsorted(edges, values, side="left") - 1
+        idx[values == edges[0]] = 0
+        valid = (values >= edges[0]) & (values <= edges[-1])
+    else:
+        # [a, b) bins
+        idx = np.searchsorted(edges, values, side="right") - 1
+        valid = (values >= edges[0]) & (values < edges[-1])
+    
+    if not valid.all():
+        raise ValueError(f"{(~valid).sum()} values fall outside bins {list(bins)}")
+    
+    return np.asarray(labels, dtype=np.int8)[idx]
+
+
+@lru_cache(maxsize=1)
+def _reference_dates_for(today: date) -> Tuple[date, date, date]:
+    """
+    Half-year reference dates, cached per calendar day.
+    
+    Keyed on the date itself, so repeated flow runs on the same day
+    (e.g. one per country) reuse the result and a new day recomputes it.
+    
+    Args:
+        today: Reference date
+        
+    Returns:
+        Tuple of (five_years_ago_start, two_years_ago_start, today)
+    """
+    return get_half_year_reference_dates(today)
+
+
 @task
 def load_rfm_data(country: str, data_path: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
@@ -36,41 +196,40 @@ def load_rfm_data(country: str, data_path: str) -> Tuple[pd.DataFrame, pd.DataFr
     
     country_path = f"{data_path}/{country}"
     
-    # Load customer addresses
-    addresses = pd.read_csv(
-        f"{country_path}/customer_addresses.csv",
-        sep=";",
-        encoding="cp850",
-        usecols=["customer_id", "registration_date", "source"],
-        parse_dates=["registration_date"]
-    )
-    
-    # Load customer transactions
-    transactions = pd.read_csv(
-        f"{country_path}/customer_transactions.csv", 
-        sep=";",
-        encoding="cp850",
-        usecols=[
-            "customer_reference", "order_number", "gross_amount",
-            "tax1", "tax2", "tax3", "transaction_date"
-        ],
-        parse_dates=["transaction_date"]
-    )
-    
-    # Load email preferences
-    email_types = pd.read_csv(
-        f"{country_path}/email_preferences.csv",
-        sep=";", 
-        encoding="cp850",
-        usecols=["customer_id", "email_type"]
-    )
-    
-    # Load existing customer groups
-    customer_groups = pd.read_csv(
-        f"{data_path}/customer_groups/customer_groups_{country}.csv",
-        sep=";",
-        encoding="cp850", 
-        usecols=["customer_id", "customer_group"]
+    # Load all sources concurrently
+    data = load_csvs({
+        # Customer addresses
+        'addresses': dict(
+            filepath=f"{country_path}/customer_addresses.csv",
+            **CSV_READ_KWARGS,
+            usecols=["customer_id", "registration_date", "source"],
+            parse_dates=["registration_date"]
+        ),
+        # Customer transactions
+        'transactions': dict(
+            filepath=f"{country_path}/customer_transactions.csv",
+            **CSV_READ_KWARGS,
+            usecols=[
+                "customer_reference", "order_number", "gross_amount",
+                "tax1", "tax2", "tax3", "transaction_date"
+            ],
+            parse_dates=["transaction_date"]
+        ),
+        # Email preferences
+        'email_types': dict(
+            filepath=f"{country_path}/email_preferences.csv",
+            **CSV_READ_KWARGS,
+            usecols=["customer_id", "email_type"]
+        ),
+        # Existing customer groups
+        'customer_groups': dict(
+            filepath=f"{data_path}/customer_groups/customer_groups_{country}.csv",
+            **CSV_READ_KWARGS,
+            usecols=["customer_id", "customer_group"]
+        )
+    })
+    addresses, transactions, email_types, customer_groups = (
+        data['addresses'], data['transactions'], data['email_types'], data['customer_groups']
     )
     
     logger.info(f"Loaded data: addresses={len(addresses):,}, transactions={len(transactions):,}")
@@ -83,7 +242,8 @@ def clean_rfm_data(
     addresses: pd.DataFrame,
     transactions: pd.DataFrame, 
     email_types: pd.DataFrame,
-    customer_groups: pd.DataFrame
+    customer_groups: pd.DataFrame,
+    half_year_info: Dict
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Clean and prepare data for RFM analysis.
@@ -93,6 +253,7 @@ def clean_rfm_data(
         transactions: Transaction data
         email_types: Email preference data
         customer_groups: Customer group data
+        half_year_info: Half-year information
         
     Returns:
         Cleaned data tuples
@@ -100,26 +261,35 @@ def clean_rfm_data(
     logger = get_run_logger()
     logger.info("Cleaning RFM data")
     
-    # Clean customer IDs
-    addresses = pad_customer_id(addresses, "customer_id")
-    email_types = pad_customer_id(email_types, "customer_id")
-    customer_groups = pad_customer_id(customer_groups, "customer_id")
-    
-    # Extract customer ID from transaction reference
-    transactions = transactions.copy()
-    transactions['customer_id'] = transactions['customer_reference'].str[2:12]
+    # Copy the inputs once; the cleaning steps below modify them in place
+    addresses = addresses.copy()
+    email_types = email_types.copy()
+    customer_groups = customer_groups.copy()
     
-    # Calculate net sales
-    transactions['net_sales'] = (
-        transactions['gross_amount'] 
-        - transactions['tax1'].fillna(0)
-        - transactions['tax2'].fillna(0) 
-        - transactions['tax3'].fillna(0)
+    # Clean customer IDs
+    pad_customer_id(addresses, "customer_id")
+    pad_customer_id(email_types, "customer_id")
+    pad_customer_id(customer_groups, "customer_id")
+    
+    # Clean dates (only re-parse columns the loader did not already parse)
+    if not pd.api.types.is_datetime64_any_dtype(addresses['registration_date']):
+        addresses['registration_date'] = pd.to_datetime(addresses['registration_date'], format='ISO8601', errors='coerce', cache=True)
+    transaction_date = transactions['transaction_date']
+    if not pd.api.types.is_datetime64_any_dtype(transaction_date):
+        transaction_date = pd.to_datetime(transaction_date, format='ISO8601', errors='coerce', cache=True)
+    
+    # Filter transactions by half-year end date before deriving columns
+    in_window = transaction_date <= pd.Timestamp(half_year_info["prev_end"])
+    
+    # Extract customer ID from transaction reference into a copy of the
+    # filtered rows, which the steps below then modify in place
+    transactions = extract_customer_id(
+        transactions[in_window], "customer_reference", "customer_id", copy=True
     )
+    transactions['transaction_date'] = transaction_date[in_window]
     
-    # Clean dates
-    addresses['registration_date'] = pd.to_datetime(addresses['registration_date'], errors='coerce')
-    transactions['transaction_date'] = pd.to_datetime(transactions['transaction_date'], errors='coerce')
+    # Calculate net sales
+    calculate_net_sales(transactions, net_amount_col="net_sales")
     
     logger.info("Data cleaning completed")
     return addresses, transactions, email_types, customer_groups
@@ -129,8 +299,7 @@ def clean_rfm_data(
 def merge_rfm_data(
     addresses: pd.DataFrame,
     transactions: pd.DataFrame,
-    email_types: pd.DataFrame,
-    half_year_info: Dict
+    email_types: pd.DataFrame
 ) -> pd.DataFrame:
     """
     Merge data sources for RFM analysis.
@@ -139,7 +308,6 @@ def merge_rfm_data(
         addresses: Customer address data
         transactions: Transaction data
         email_types: Email preference data
-        half_year_info: Half-year information
         
     Returns:
         Merged DataFrame
@@ -147,19 +315,31 @@ def merge_rfm_data(
     logger = get_run_logger()
     logger.info("Merging RFM data")
     
-    # Filter transactions by half-year end date
-    prev_end = pd.Timestamp(half_year_info["prev_end"])
-    transactions = transactions[transactions['transaction_date'] <= prev_end]
+    # Encode customer IDs once as shared integer codes, so both joins hash
+    # and compare ints instead of strings
+    codes, customer_ids = pd.factorize(pd.concat(
+        [addresses["customer_id"], transactions["customer_id"], email_types["customer_id"]],
+        ignore_index=True
+    ))
+    tx_start = len(addresses)
+    email_start = tx_start + len(transactions)
+    
+    addresses = addresses[["registration_date"]].assign(cid_code=codes[:tx_start])
+    transactions = transactions[["order_number", "net_sales", "transaction_date"]].assign(
+        cid_code=codes[tx_start:email_start]
+    )
+    email_types = email_types[["email_type"]].assign(cid_code=codes[email_start:])
     
     # Merge addresses with transactions
-    merged = addresses.merge(
-        transactions[["customer_id", "order_number", "net_sales", "transaction_date"]],
-        on="customer_id", 
-        how="left"
-    )
+    merged = addresses.merge(transactions, on="cid_code", how="left")
     
     # Merge with email types
-    merged = merged.merge(email_types, on="customer_id", how="left")
+    merged = merged.merge(email_types, on="cid_code", how="left")
+    
+    # Restore customer IDs from their codes
+    merged["customer_id"] = customer_ids.array.take(
+        merged["cid_code"].to_numpy(), allow_fill=True
+    )
     
     # Select relevant columns
     merged = merged[[
@@ -172,108 +352,95 @@ def merge_rfm_data(
 
 
 @task
-def calculate_customer_metrics(merged_data: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate customer-level metrics for RFM analysis.
-    
-    Args:
-        merged_data: Merged customer and transaction data
-        
-    Returns:
-        DataFrame with customer metrics
-    """
-    logger = get_run_logger()
-    logger.info("Calculating customer metrics")
-    
-    # Group by customer
-    customer_metrics = (
-        merged_data.groupby("customer_id", as_index=False)
-        .agg({
-            'email_type': 'first',
-            'registration_date': 'first',
-            'order_number': 'nunique',  # Frequency
-            'net_sales': 'sum',        # Monetary
-            'transaction_date': 'max'  # Recency
-        })
-        .rename(columns={
-            'order_number': 'frequency',
-            'net_sales': 'monetary',
-            'transaction_date': 'recency'
-        })
-    )
-    
-    # Handle customers with no transactions
-    customer_metrics['frequency'] = customer_metrics['frequency'].fillna(0)
-    customer_metrics['monetary'] = customer_metrics['monetary'].fillna(0)
-    
-    logger.info(f"Calculated metrics for {len(customer_metrics):,} customers")
-    return customer_metrics
-
-
-@task
-def calculate_time_period_metrics(
+def calculate_rfm_metrics(
     merged_data: pd.DataFrame,
     five_years_ago: pd.Timestamp,
     two_years_ago: pd.Timestamp,
     today: pd.Timestamp
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
-    Calculate metrics for different time periods.
+    Calculate customer-level and time period metrics for RFM analysis.
+    
+    Customer IDs and order numbers are factorized once and shared by the
+    overall and per-period groupbys.
     
     Args:
-        merged_data: Merged customer data
+        merged_data: Merged customer and transaction data
         five_years_ago: Five years ago timestamp
         two_years_ago: Two years ago timestamp  
         today: Current timestamp
         
     Returns:
-        Tuple of (3-5 years metrics, last 2 years metrics)
+        Tuple of (customer metrics, 3-5 years metrics, last 2 years metrics)
     """
     logger = get_run_logger()
-    logger.info("Calculating time period metrics")
+    logger.info("Calculating customer and time period metrics")
     
-    # Filter for 3-5 years ago
-    mask_3to5 = (
-        (merged_data['transaction_date'] >= five_years_ago) & 
-        (merged_data['transaction_date'] < two_years_ago)
-    )
-    data_3to5 = merged_data[mask_3to5]
+    # The flow passes plain dates, which don't compare with datetime64 columns
+    five_years_ago = pd.Timestamp(five_years_ago)
+    two_years_ago = pd.Timestamp(two_years_ago)
+    today = pd.Timestamp(today)
     
-    # Filter for last 2 years
-    mask_last2 = (
-        (merged_data['transaction_date'] >= two_years_ago) & 
-        (merged_data['transaction_date'] < today)
-    )
-    data_last2 = merged_data[mask_last2]
-    
-    # Calculate metrics for 3-5 years ago
-    metrics_3to5 = (
-        data_3to5.groupby("customer_id", as_index=False)
-        .agg({
-            'order_number': 'nunique',
-            'net_sales': 'sum'
-        })
-        .rename(columns={
-            'order_number': 'freq_3to5_years',
-            'net_sales': 'monetary_3to5_years'
-        })
-    )
+    # Rows without a customer ID belong to no group
+    has_customer = merged_data['customer_id'].notna().to_numpy()
+    if not has_customer.all():
+        merged_data = merged_data[has_customer]
+    
+    # Codes follow customer_id order, so sorted groupbys on them come out
+    # ordered like a groupby on customer_id
+    cid_codes, customer_ids = pd.factorize(merged_data['customer_id'], sort=True)
+    order_codes, _ = pd.factorize(merged_data['order_number'])
+    n_customers = len(customer_ids)
     
-    # Calculate metrics for last 2 years
-    metrics_last2 = (
-        data_last2.groupby("customer_id", as_index=False)
-        .agg({
-            'order_number': 'nunique', 
-            'net_sales': 'sum'
-        })
-        .rename(columns={
-            'order_number': 'freq_last_2_years',
-            'net_sales': 'monetary_last_2_years'
-        })
+    # Group by customer
+    grouped = merged_data.groupby(cid_codes, sort=True)
+    customer_metrics = pd.DataFrame({
+        'customer_id': customer_ids.array,
+        'email_type': _first_valid_by_code(cid_codes, merged_data['email_type'], n_customers),
+        'registration_date': grouped['registration_date'].first().to_numpy(),
+        'frequency': _distinct_orders_by_code(cid_codes, order_codes, n_customers),
+        'monetary': grouped['net_sales'].sum().to_numpy(),
+        'recency': grouped['transaction_date'].max().to_numpy()
+    })
+    
+    # Bucket every transaction into its period
+    transaction_date = merged_data['transaction_date']
+    period = np.select(
+        [
+            ((transaction_date >= five_years_ago) & (transaction_date < two_years_ago)).to_numpy(),
+            ((transaction_date >= two_years_ago) & (transaction_date < today)).to_numpy()
+        ],
+        [PERIOD_3TO5, PERIOD_LAST2],
+        default=0
     )
     
-    logger.info(f"Time period metrics calculated")
-    return metrics_3to5, metrics_last2
+    # Orders and sales per (customer, period), in one groupby; rows within
+    # a group keep their order, so sums match a groupby on the period rows
+    period_keys = np.where(period > 0, cid_codes * 3 + period, -1)
+    period_frequency = _distinct_orders_by_code(period_keys, order_codes, n_customers * 3)
+    period_sales = merged_data['net_sales'].groupby(period_keys, sort=True).sum()
+    period_sales = period_sales[period_sales.index >= 0]
+    period_customers = period_sales.index.to_numpy() // 3
+    period_codes = period_sales.index.to_numpy() % 3
+    
+    # Metrics for 3-5 years ago
+    in_3to5 = period_codes == PERIOD_3TO5
+    metrics_3to5 = pd.DataFrame({
+        'customer_id': customer_ids.array.take(period_customers[in_3to5]),
+        'freq_3to5_years': period_frequency[period_sales.index[in_3to5]],
+        'monetary_3to5_years': period_sales.to_numpy()[in_3to5]
+    })
+    
+    # Metrics for last 2 years
+    in_last2 = period_codes == PERIOD_LAST2
+    metrics_last2 = pd.DataFrame({
+        'customer_id': customer_ids.array.take(period_customers[in_last2]),
+        'freq_last_2_years': period_frequency[period_sales.index[in_last2]],
+        'monetary_last_2_years': period_sales.to_numpy()[in_last2]
+    })
+    
+    logger.info(f"Calculated metrics for {len(customer_metrics):,} customers")
+    return customer_metrics, metrics_3to5, metrics_last2
 
 
 @task
@@ -304,22 +471,22 @@ def calculate_rfm_scores(
     
     # Fill missing values
     for col in ['freq_3to5_years', 'freq_last_2_years']:
-        rfm_data[col] = rfm_data[col].fillna(0)
+        rfm_data[col] = rfm_data[col].fillna(0).astype(np.int32)
     for col in ['monetary_3to5_years', 'monetary_last_2_years']:
         rfm_data[col] = rfm_data[col].fillna(0)
     
     # Calculate weighted 5-year metrics
     rfm_data['freq_5_years'] = (
         (rfm_data['freq_3to5_years'] * 0.5) + rfm_data['freq_last_2_years']
-    ).round()
+    ).round().astype(np.int32)
     
     rfm_data['monetary_5_years'] = (
         (rfm_data['monetary_3to5_years'] * 0.5) + rfm_data['monetary_last_2_years']
     ).round()
     
     # Calculate recency score (days since last purchase)
-    rfm_data['recency_days'] = (reference_date - rfm_data['recency']).dt.days
-    rfm_data['recency_days'] = rfm_data['recency_days'].fillna(9999)  # No purchases
+    rfm_data['recency_days'] = (pd.Timestamp(reference_date) - rfm_data['recency']).dt.days
+    rfm_data['recency_days'] = rfm_data['recency_days'].fillna(9999).astype(np.int32)  # No purchases
     
     # Calculate RFM scores using bins
     monetary_bins = RFM_CONFIG['MONETARY_BINS']
@@ -328,34 +495,20 @@ def calculate_rfm_scores(
     freq_labels = RFM_CONFIG['FREQ_LABELS']
     
     # Monetary score
-    rfm_data['m_score'] = pd.cut(
-        rfm_data['monetary_5_years'],
-        bins=monetary_bins,
-        labels=monetary_labels,
-        include_lowest=True,
-        right=False
-    ).astype(int)
+    rfm_data['m_score'] = _bin_scores(
+        rfm_data['monetary_5_years'], monetary_bins, monetary_labels, right=False
+    )
     
     # Frequency score
-    rfm_data['f_score'] = pd.cut(
-        rfm_data['freq_5_years'],
-        bins=freq_bins,
-        labels=freq_labels,
-        include_lowest=True
-    ).astype(int)
+    rfm_data['f_score'] = _bin_scores(rfm_data['freq_5_years'], freq_bins, freq_labels)
     
     # Recency score (inverse - lower days = higher score)
-    recency_bins = [0, 30, 90, 180, 365, float('inf')]
-    recency_labels = [5, 4, 3, 2, 1]
-    rfm_data['r_score'] = pd.cut(
-        rfm_data['recency_days'],
-        bins=recency_bins,
-        labels=recency_labels,
-        include_lowest=True
-    ).astype(int)
-    
-    # Combined MF score
-    rfm_data['mf_score'] = ((rfm_data['m_score'] + rfm_data['f_score']) / 2).round()
+    rfm_data['r_score'] = _bin_scores(rfm_data['recency_days'], RECENCY_BINS, RECENCY_LABELS)
+    
+    # Combined MF score: (m + f) / 2 rounded half to even, as .round() does
+    mf_sum = rfm_data['m_score'].to_numpy(dtype=np.int16) + rfm_data['f_score'].to_numpy(dtype=np.int16)
+    half = mf_sum >> 1
+    rfm_data['mf_score'] = (half + (mf_sum & half & 1)).astype(np.int8)
     
     logger.info("RFM scores calculated")
     return rfm_data
@@ -375,42 +528,20 @@ def assign_customer_segments(rfm_data: pd.DataFrame) -> pd.DataFrame:
     logger = get_run_logger()
     logger.info("Assigning customer segments")
     
-    def assign_segment(row):
-        r, f, mf = row['r_score'], row['f_score'], row['mf_score']
-        
-        if pd.isna(r) or pd.isna(f) or pd.isna(mf):
-            return "Unknown"
-        
-        # RFM segmentation logic
-        if mf >= 4 and r >= 4:
-            return "01-Champions"
-        elif mf >= 4 and r in [2, 3]:
-            return "02-Treue Kunden"
-        elif mf == 5 and r <= 1:
-            return "03-Nicht zu verlieren"
-        elif mf in [2, 3] and r >= 3:
-            return "04-Potenziell loyale Kunden"
-        elif mf == 3 and r in [2, 3]:
-            return "05-Brauchen Aufmerksamkeit"
-        elif mf >= 3 and r <= 1:
-            return "06-Gefährdete Kunden"
-        elif mf == 1 and r >= 4:
-            return "08-Reaktivierte Kunden"
-        elif mf == 1 and r in [2, 3]:
-            return "09-Vielversprechende Kunden"
-        elif mf <= 2 and r in [2, 3]:
-            return "10-Abwandernde Kunden"
-        elif mf == 2 and r <= 1:
-            return "11-Schlafende Kunden"
-        elif mf == 1 and r <= 1:
-            return "12-Verlorene Kunden"
-        else:
-            return "Nicht klassifiziert"
-    
-    rfm_data['customer_segment'] = rfm_data.apply(assign_segment, axis=1)
+    # Scores come in as int8; missing scores are looked up as 0 and then
+    # marked unknown
+    unknown = rfm_data[['r_score', 'f_score', 'mf_score']].isna().any(axis=1).to_numpy()
+    r = rfm_data['r_score'].to_numpy(dtype=np.int8, na_value=0)
+    mf = rfm_data['mf_score'].to_numpy(dtype=np.int8, na_value=0)
+    
+    # Look up the segment code of every (r_score, mf_score) pair
+    codes = SEGMENT_TABLE[r, mf]
+    codes[unknown] = SEGMENT_NAMES.index("Unknown")
     
     # Special cases
-    rfm_data.loc[rfm_data['monetary'] == 0, 'customer_segment'] = "13-Interessenten"
+    codes[rfm_data['monetary'].to_numpy() == 0] = SEGMENT_NAMES.index("13-Interessenten")
+    
+    rfm_data['customer_segment'] = pd.Categorical.from_codes(codes, categories=SEGMENT_NAMES)
     
     logger.info("Customer segments assigned")
     return rfm_data
@@ -432,9 +563,14 @@ def export_rfm_results(rfm_data: pd.DataFrame, customer_groups: pd.DataFrame, co
     logger = get_run_logger()
     logger.info(f"Exporting RFM results for {country}")
     
-    # Merge with customer groups
-    final_data = rfm_data.merge(customer_groups, on="customer_id", how="left")
-    final_data = final_data.drop_duplicates(subset="customer_id")
+    # Look up each customer's group (first entry wins)
+    group_lookup = (
+        customer_groups.drop_duplicates(subset="customer_id")
+        .set_index("customer_id")["customer_group"]
+    )
+    final_data = rfm_data.assign(
+        customer_group=rfm_data["customer_id"].map(group_lookup)
+    )
     
     # Create output directory
     output_dir = f"data/output/rfm_analysis"
@@ -443,6 +579,11 @@ def export_rfm_results(rfm_data: pd.DataFrame, customer_groups: pd.DataFrame, co
     # Export results
     output_file = f"{output_dir}/rfm_segments_{country}.csv"
     final_data.to_csv(output_file, index=False, sep=";", encoding="cp850")
+    if WRITE_PARQUET:
+        save_parquet(
+            final_data, f"{output_dir}/rfm_segments_{country}.parquet",
+            compression=PARQUET_COMPRESSION
+        )
     
     logger.info(f"Exported {len(final_data):,} customer segments to {output_file}")
     return output_file
@@ -471,30 +612,27 @@ def run_rfm_analysis(
     
     try:
         # Get reference dates
-        five_years_ago, two_years_ago, today = get_half_year_reference_dates()
+        five_years_ago, two_years_ago, today = _reference_dates_for(date.today())
         
         # Load data
         addresses, transactions, email_types, customer_groups = load_rfm_data(country, data_path)
         
-        # Clean data
-        addresses, transactions, email_types, customer_groups = clean_rfm_data(
-            addresses, transactions, email_types, customer_groups
-        )
-        
         # Get half-year info
         half_year_info = {
             "prev_start": five_years_ago,
             "prev_end": two_years_ago
         }
         
-        # Merge data
-        merged_data = merge_rfm_data(addresses, transactions, email_types, half_year_info)
+        # Clean data
+        addresses, transactions, email_types, customer_groups = clean_rfm_data(
+            addresses, transactions, email_types, customer_groups, half_year_info
+        )
         
-        # Calculate customer metrics
-        customer_metrics = calculate_customer_metrics(merged_data)
+        # Merge data
+        merged_data = merge_rfm_data(addresses, transactions, email_types)
         
-        # Calculate time period metrics
-        metrics_3to5, metrics_last2 = calculate_time_period_metrics(
+        # Calculate customer and time period metrics
+        customer_metrics, metrics_3to5, metrics_last2 = calculate_rfm_metrics(
             merged_data, five_years_ago, two_years_ago, today
         )
         
@@ -511,6 +649,7 @@ def run_rfm_analysis(
         
         # Summary statistics
         segment_counts = rfm_data['customer_segment'].value_counts()
+        segment_counts = segment_counts[segment_counts > 0]
         
         results = {
             'country': country,
@@ -9,17 +9,19 @@ a format suitable for analytics and reporting.
 import os
 import time
 import pandas as pd
+import numpy as np
 from pathlib import Path
 from prefect import flow, task, get_run_logger
 from typing import Dict, Any
 
 from config.settings import (
     COUNTRY_MAPPING, SUPPORTED_COUNTRIES, CSV_READ_KWARGS, 
-    OUTPUT_PATH, OUTPUT_FILES
+    OUTPUT_PATH, OUTPUT_FILES, WRITE_PARQUET, PARQUET_COMPRESSION
 )
 from src.utils.data_processing import (
-    pad_customer_id, calculate_age_groups, assign_data_sources,
-    process_salutation, calculate_net_sales, validate_data_quality
+    load_csvs, save_parquet, pad_customer_id, extract_customer_id,
+    calculate_age_groups, assign_data_sources, process_salutation,
+    calculate_net_sales, validate_data_quality
 )
 
 
@@ -41,56 +43,50 @@ def load_customer_data(country: str, data_path: str) -> Dict[str, pd.DataFrame]:
     country_path = Path(data_path) / country
     
     try:
-        # Load customer addresses
-        addresses = pd.read_csv(
-            country_path / 'customer_addresses.csv',
-            **CSV_READ_KWARGS,
-            parse_dates=["registration_date", "birth_date"],
-            usecols=[
-                "customer_id", "salutation", "title", "first_name", "last_name",
-                "source", "postal_code", "city", "marketing_consent", 
-                "phone", "registration_date", "birth_date"
-            ]
-        )
-        
-        # Load customer transactions
-        transactions = pd.read_csv(
-            country_path / 'customer_transactions.csv',
-            **CSV_READ_KWARGS,
-            parse_dates=["transaction_date"],
-            usecols=[
-                "invoice_number", "order_number", "customer_reference", 
-                "transaction_date", "gross_amount", "tax1", "tax2", "tax3"
-            ]
-        )
-        
-        # Load customer emails
-        emails = pd.read_csv(
-            country_path / 'customer_emails.csv',
-            **CSV_READ_KWARGS,
-            usecols=["customer_id", "email_address", "is_primary"]
-        )
-        
-        # Load advertising data
-        advertising = pd.read_csv(
-            country_path / 'advertising_data.csv',
-            **CSV_READ_KWARGS,
-            parse_dates=["advertising_date"],
-            usecols=["customer_id", "advertising_date", "media_code"]
-        )
+        # Load all sources concurrently
+        data = load_csvs({
+            # Customer addresses
+            'addresses': dict(
+                filepath=country_path / 'customer_addresses.csv',
+                **CSV_READ_KWARGS,
+                parse_dates=["registration_date", "birth_date"],
+                usecols=[
+                    "customer_id", "salutation", "first_name", "last_name",
+                    "source", "city", "registration_date", "birth_date"
+                ]
+            ),
+            # Customer transactions
+            'transactions': dict(
+                filepath=country_path / 'customer_transactions.csv',
+                **CSV_READ_KWARGS,
+                parse_dates=["transaction_date"],
+                usecols=[
+                    "order_number", "customer_reference", "transaction_date",
+                    "gross_amount", "tax1", "tax2", "tax3"
+                ]
+            ),
+            # Customer emails
+            'emails': dict(
+                filepath=country_path / 'customer_emails.csv',
+                **CSV_READ_KWARGS,
+                usecols=["customer_id", "email_address", "is_primary"]
+            ),
+            # Advertising data
+            'advertising': dict(
+                filepath=country_path / 'advertising_data.csv',
+                **CSV_READ_KWARGS,
+                parse_dates=["advertising_date"],
+                usecols=["customer_id", "advertising_date", "media_code"]
+            )
+        })
         
         logger.info(f"Successfully loaded data for {country}")
-        logger.info(f"Addresses: {len(addresses):,} rows")
-        logger.info(f"Transactions: {len(transactions):,} rows")
-        logger.info(f"Emails: {len(emails):,} rows")
-        logger.info(f"Advertising: {len(advertising):,} rows")
+        logger.info(f"Addresses: {len(data['addresses']):,} rows")
+        logger.info(f"Transactions: {len(data['transactions']):,} rows")
+        logger.info(f"Emails: {len(data['emails']):,} rows")
+        logger.info(f"Advertising: {len(data['advertising']):,} rows")
         
-        return {
-            'addresses': addresses,
-            'transactions': transactions,
-            'emails': emails,
-            'advertising': advertising
-        }
+        return data
         
     except Exception as e:
         logger.error(f"Error loading data for {country}: {str(e)}")
@@ -112,19 +108,20 @@ def transform_customer_data(data: Dict[str, pd.DataFrame], country: str) -> pd.D
     logger = get_run_logger()
     logger.info(f"Transforming data for {country}")
     
-    addresses = data['addresses']
-    transactions = data['transactions']
-    emails = data['emails']
-    advertising = data['advertising']
+    # Copy the inputs once; the processing steps below modify them in place
+    addresses = data['addresses'].copy()
+    transactions = data['transactions'].copy()
+    emails = data['emails'].copy()
+    advertising = data['advertising'].copy()
     
     # Process customer IDs
-    addresses = pad_customer_id(addresses, "customer_id")
-    transactions = pad_customer_id(transactions, "customer_reference")
-    emails = pad_customer_id(emails, "customer_id")
-    advertising = pad_customer_id(advertising, "customer_id")
+    pad_customer_id(addresses, "customer_id")
+    pad_customer_id(transactions, "customer_reference")
+    pad_customer_id(emails, "customer_id")
+    pad_customer_id(advertising, "customer_id")
     
     # Calculate net sales
-    transactions = calculate_net_sales(
+    calculate_net_sales(
         transactions, 
         gross_amount_col="gross_amount",
         tax1_col="tax1",
@@ -133,26 +130,32 @@ def transform_customer_data(data: Dict[str, pd.DataFrame], country: str) -> pd.D
     )
     
     # Extract customer ID from transaction reference
-    transactions['customer_id'] = transactions['customer_reference'].str[2:12]
+    extract_customer_id(transactions, "customer_reference", "customer_id")
     
     # Process addresses
-    addresses = calculate_age_groups(addresses, "birth_date")
-    addresses = assign_data_sources(addresses, "source")
-    addresses = process_salutation(addresses, "salutation")
-    
-    # Get latest advertising per customer
-    advertising_latest = (
-        advertising.groupby('customer_id')
-        .agg({
-            'advertising_date': 'max',
-            'media_code': 'last'
-        })
-        .reset_index()
-        .rename(columns={
-            'advertising_date': 'last_advertising_date',
-            'media_code': 'last_media_code'
-        })
+    calculate_age_groups(addresses, "birth_date")
+    assign_data_sources(addresses, "source")
+    process_salutation(addresses, "salutation")
+    
+    # Get latest advertising per customer: the latest date comes from a
+    # date sort (missing dates first), the media code is the last one
+    # recorded in file order
+    advertising = advertising.dropna(subset=['customer_id'])
+    last_dates = (
+        advertising[['customer_id', 'advertising_date']]
+        .sort_values(['customer_id', 'advertising_date'], kind='stable', na_position='first')
+        .drop_duplicates(subset='customer_id', keep='last')
     )
+    last_media = (
+        advertising[['customer_id', 'media_code']]
+        .dropna(subset=['media_code'])
+        .drop_duplicates(subset='customer_id', keep='last')
+    )
+    advertising_latest = last_dates.merge(last_media, on='customer_id', how='left')
+    advertising_latest.rename(columns={
+        'advertising_date': 'last_advertising_date',
+        'media_code': 'last_media_code'
+    }, inplace=True)
     
     # Merge all data
     merged_data = addresses.merge(emails, on="customer_id", how="left")
@@ -181,9 +184,17 @@ def aggregate_customer_data(merged_data: pd.DataFrame, country: str) -> pd.DataF
     logger = get_run_logger()
     logger.info(f"Aggregating data for {country}")
     
-    # Group by customer and order
-    customer_orders = (
-        merged_data.groupby(["customer_id", "order_number"])
+    # Group on categorical codes instead of hashing the ID strings
+    merged_data = merged_data[merged_data['customer_id'].notna()]
+    merged_data = merged_data.assign(
+        customer_id=merged_data['customer_id'].astype('category'),
+        order_number=merged_data['order_number'].astype('category')
+    )
+    
+    # Group by customer and order; customers without orders form a group
+    # with a missing order number
+    final_data = (
+        merged_data.groupby(["customer_id", "order_number"], observed=True, dropna=False)
         .agg({
             'salutation': 'first',
             'first_name': 'first', 
@@ -201,42 +212,22 @@ def aggregate_customer_data(merged_data: pd.DataFrame, country: str) -> pd.DataF
         .reset_index()
     )
     
-    # Handle customers without orders
-    customers_without_orders = merged_data[merged_data['order_number'].isna()]
-    if not customers_without_orders.empty:
-        customers_without_orders = (
-            customers_without_orders.groupby("customer_id")
-            .agg({
-                'salutation': 'first',
-                'first_name': 'first',
-                'last_name': 'first', 
-                'age_group': 'first',
-                'city': 'first',
-                'registration_date': 'first',
-                'source_name': 'first',
-                'channel_type': 'first',
-                'net_amount': 'sum'
-            })
-            .reset_index()
-        )
-        customers_without_orders['order_number'] = None
-        
-        # Combine both groups
-        final_data = pd.concat([customer_orders, customers_without_orders])
-    else:
-        final_data = customer_orders
+    # Customers without orders carry no order-level fields and are listed
+    # after all orders
+    without_order = final_data['order_number'].isna().to_numpy()
+    for col in ['transaction_date', 'last_advertising_date', 'last_media_code']:
+        final_data[col] = final_data[col].mask(without_order)
+    final_data = final_data.iloc[np.argsort(without_order, kind='stable')]
     
-    # Clean up and rename columns
-    final_data = final_data.rename(columns={
+    # Clean up and rename columns (in place, without copying the data)
+    final_data.rename(columns={
         'order_number': 'order_id',
         'transaction_date': 'order_date',
         'net_amount': 'total_net_sales',
         'last_advertising_date': 'last_advertising_date',
         'last_media_code': 'last_advertising_media'
-    })
+    }, inplace=True)
     
-    # Remove duplicates
-    final_data = final_data.drop_duplicates(subset=["customer_id", "order_id"])
     final_data['country'] = COUNTRY_MAPPING.get(country, country)
     
     logger.info(f"Aggregated data: {len(final_data):,} rows")
@@ -262,7 +253,10 @@ def validate_output_data(data: pd.DataFrame, country: str) -> Dict[str, Any]:
         'age_group', 'city', 'total_net_sales', 'country'
     ]
     
-    validation_results = validate_data_quality(data, required_columns)
+    # One row per customer and order
+    validation_results = validate_data_quality(
+        data, required_columns, dup_subset=['customer_id', 'order_id']
+    )
     
     logger.info(f"Data validation for {country}:")
     logger.info(f"Total rows: {validation_results['total_rows']:,}")
@@ -297,6 +291,8 @@ def save_processed_data(data: pd.DataFrame, country: str, output_path: str) -> s
     
     # Save data
     data.to_csv(filepath, index=False, sep=";", encoding="cp850")
+    if WRITE_PARQUET:
+        save_parquet(data, filepath.with_suffix(".parquet"), compression=PARQUET_COMPRESSION)
     
     logger.info(f"Saved {len(data):,} rows to {filepath}")
     return str(filepath)
@@ -320,7 +316,7 @@ def run_customer_etl_pipeline(
         Dictionary containing processing results
     """
     logger = get_run_logger()
-    start_time = time.time()
+    start_time = time.monotonic()
     
     logger.info(f"Starting customer ETL pipeline for {country}")
     
@@ -350,7 +346,7 @@ def run_customer_etl_pipeline(
         total_customers = aggregated_data['customer_id'].nunique()
         total_sales = aggregated_data['total_net_sales'].fillna(0).sum()
         
-        processing_time = time.time() - start_time
+        processing_time = time.monotonic() - start_time
         
         results = {
             'country': country,
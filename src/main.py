@@ -11,15 +11,108 @@ Licensed under the MIT License - see LICENSE file for details.
 import os
 import time
 from datetime import datetime
-from prefect import flow, get_run_logger
-from typing import Dict, Any, List
+from pathlib import Path
+from prefect import flow, task, get_run_logger
+from prefect.artifacts import create_table_artifact
+from prefect.futures import as_completed
+from prefect.task_runners import ThreadPoolTaskRunner
+from prefect.tasks import task_input_hash
+from prefect.utilities.hashing import hash_objects
+from typing import Callable, Dict, Any, List, Optional
 
-from config.settings import SUPPORTED_COUNTRIES
+from config.settings import (
+    SUPPORTED_COUNTRIES, TASK_CACHE_EXPIRATION, MAX_CONCURRENT_TASKS,
+    BASE_DATA_PATH, OUTPUT_PATH, OUTPUT_FILES
+)
 from src.etl.customer_pipeline import run_customer_etl_pipeline
 from src.analytics.rfm_analysis import run_rfm_analysis
 
 
-@flow(name="complete-etl-pipeline")
+def _country_cache_key(output_file: Callable[[Dict[str, Any]], Path]):
+    """
+    Build a cache key function for a per-country pipeline task.
+    
+    The key covers the task inputs and the name, modification time and
+    size of every source file of the country, so changed source data is
+    picked up. While the task's output file is missing no key is returned,
+    so the run is neither served from nor stored in the cache and the
+    output gets rebuilt.
+    
+    Args:
+        output_file: Maps the task parameters to the file the task writes
+        
+    Returns:
+        Cache key function for the task decorator
+    """
+    def cache_key(context, parameters: Dict[str, Any]) -> Optional[str]:
+        output = output_file(parameters).resolve()
+        if not output.exists():
+            return None
+        
+        country_path = Path(parameters.get("data_path") or BASE_DATA_PATH) / parameters["country"]
+        sources = sorted(
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(country_path) if entry.is_file()
+        ) if country_path.is_dir() else []
+        
+        return hash_objects(task_input_hash(context, parameters), str(output), sources)
+    
+    return cache_key
+
+
+@task(
+    name="customer-etl-country",
+    cache_key_fn=_country_cache_key(
+        lambda parameters: Path(parameters.get("output_path") or OUTPUT_PATH)
+        / OUTPUT_FILES['customer_analysis'].format(country=parameters["country"])
+    ),
+    cache_expiration=TASK_CACHE_EXPIRATION
+)
+def run_customer_etl_task(country: str, data_path: str = None, output_path: str = None) -> Dict[str, Any]:
+    """
+    Run the customer ETL pipeline for one country as a submittable task.
+    
+    Args:
+        country: Country code
+        data_path: Path to source data files
+        output_path: Path for output files
+        
+    Returns:
+        Customer ETL results
+    """
+    return run_customer_etl_pipeline(
+        country=country,
+        data_path=data_path,
+        output_path=output_path
+    )
+
+
+@task(
+    name="rfm-analysis-country",
+    cache_key_fn=_country_cache_key(
+        lambda parameters: Path("data/output/rfm_analysis")
+        / OUTPUT_FILES['rfm_segments'].format(country=parameters["country"])
+    ),
+    cache_expiration=TASK_CACHE_EXPIRATION
+)
+def run_rfm_analysis_task(country: str, data_path: str = None) -> Dict[str, Any]:
+    """
+    Run the RFM analysis for one country as a submittable task.
+    
+    Args:
+        country: Country code
+        data_path: Path to source data files
+        
+    Returns:
+        RFM analysis results
+    """
+    return run_rfm_analysis(
+        country=country,
+        data_path=data_path
+    )
+
+
+@flow(name="complete-etl-pipeline", task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCURRENT_TASKS))
 def run_complete_etl_pipeline(
     countries: List[str] = None,
     data_path: str = None,
@@ -37,7 +130,7 @@ def run_complete_etl_pipeline(
         Dictionary containing processing results for all countries
     """
     logger = get_run_logger()
-    start_time = time.time()
+    start_time = time.monotonic()
     
     if countries is None:
         countries = SUPPORTED_COUNTRIES
@@ -52,49 +145,74 @@ def run_complete_etl_pipeline(
         'failed_countries': []
     }
     
+    # Build the per-country DAG. RFM analysis reads the raw source files,
+    # not the customer ETL output, so both stages of every country are
+    # independent and start as soon as a worker is free
+    futures = []
+    stages = {}
     for country in countries:
-        country_start_time = time.time()
-        
+        customer_future = run_customer_etl_task.submit(
+            country=country,
+            data_path=data_path,
+            output_path=output_path
+        )
+        rfm_future = run_rfm_analysis_task.submit(
+            country=country,
+            data_path=data_path
+        )
+        stages[customer_future.task_run_id] = (country, 'customer_etl')
+        stages[rfm_future.task_run_id] = (country, 'rfm_analysis')
+        futures.extend([customer_future, rfm_future])
+    
+    # Record stage results in completion order
+    country_results = {country: {'country': country} for country in countries}
+    errors = {}
+    for future in as_completed(futures):
+        country, stage = stages[future.task_run_id]
         try:
-            logger.info(f"Processing country: {country}")
-            
-            # Run customer ETL pipeline
-            customer_results = run_customer_etl_pipeline(
-                country=country,
-                data_path=data_path,
-                output_path=output_path
-            )
-            
-            # Run RFM analysis
-            rfm_results = run_rfm_analysis(
-                country=country,
-                data_path=data_path
-            )
-            
-            country_processing_time = time.time() - country_start_time
-            
-            results['countries_processed'].append({
-                'country': country,
-                'customer_etl': customer_results,
-                'rfm_analysis': rfm_results,
-                'processing_time': country_processing_time
-            })
-            
-            results['successful_countries'].append(country)
-            
-            logger.info(f"Successfully processed {country} in {country_processing_time:.2f} seconds")
-            
+            country_results[country][stage] = future.result()
+            # Stages run concurrently, so a country's processing time is the
+            # time until its last stage finished
+            country_results[country]['processing_time'] = time.monotonic() - start_time
+            logger.info(f"Finished {stage} for {country}")
         except Exception as e:
-            logger.error(f"Failed to process {country}: {str(e)}")
+            logger.error(f"Failed {stage} for {country}: {str(e)}")
+            errors.setdefault(country, str(e))
+    
+    for country in countries:
+        if country in errors:
             results['failed_countries'].append({
                 'country': country,
-                'error': str(e)
+                'error': errors[country]
             })
+            continue
+        
+        country_processing_time = country_results[country]['processing_time']
+        results['countries_processed'].append(country_results[country])
+        results['successful_countries'].append(country)
+        
+        logger.info(f"Successfully processed {country} in {country_processing_time:.2f} seconds")
     
-    total_processing_time = time.time() - start_time
+    total_processing_time = time.monotonic() - start_time
     results['total_processing_time'] = total_processing_time
     results['end_time'] = datetime.now().isoformat()
     
+    # Publish the per-country outcome once, as a single table artifact
+    summary = [
+        {
+            'country': country,
+            'status': 'failed' if country in errors else 'success',
+            'processing_time': round(country_results[country].get('processing_time', 0.0), 2),
+            'error': errors.get(country, '')
+        }
+        for country in countries
+    ]
+    create_table_artifact(
+        table=summary,
+        key="etl-country-summary",
+        description=f"ETL pipeline results for {len(countries)} countries"
+    )
+    
     # Summary
     logger.info("ETL Pipeline Summary:")
     logger.info(f"Total processing time: {total_processing_time:.2f} seconds")
@@ -107,7 +225,7 @@ def run_complete_etl_pipeline(
     return results
 
 
-@flow(name="customer-data-only")
+@flow(name="customer-data-only", task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCURRENT_TASKS))
 def run_customer_data_pipeline(
     countries: List[str] = None,
     data_path: str = None,
@@ -125,7 +243,7 @@ def run_customer_data_pipeline(
         Dictionary containing processing results
     """
     logger = get_run_logger()
-    start_time = time.time()
+    start_time = time.monotonic()
     
     if countries is None:
         countries = SUPPORTED_COUNTRIES
@@ -138,13 +256,18 @@ def run_customer_data_pipeline(
         'total_processing_time': 0
     }
     
-    for country in countries:
+    futures = {
+        country: run_customer_etl_task.submit(
+            country=country,
+            data_path=data_path,
+            output_path=output_path
+        )
+        for country in countries
+    }
+    
+    for country, future in futures.items():
         try:
-            country_results = run_customer_etl_pipeline(
-                country=country,
-                data_path=data_path,
-                output_path=output_path
-            )
+            country_results = future.result()
             
             results['countries_processed'].append({
                 'country': country,
@@ -156,13 +279,13 @@ def run_customer_data_pipeline(
         except Exception as e:
             logger.error(f"Failed to process customer data for {country}: {str(e)}")
     
-    results['total_processing_time'] = time.time() - start_time
+    results['total_processing_time'] = time.monotonic() - start_time
     results['end_time'] = datetime.now().isoformat()
     
     return results
 
 
-@flow(name="rfm-analysis-only")
+@flow(name="rfm-analysis-only", task_runner=ThreadPoolTaskRunner(max_workers=MAX_CONCURRENT_TASKS))
 def run_rfm_analysis_pipeline(
     countries: List[str] = None,
     data_path: str = None
@@ -178,7 +301,7 @@ def run_rfm_analysis_pipeline(
         Dictionary containing analysis results
     """
     logger = get_run_logger()
-    start_time = time.time()
+    start_time = time.monotonic()
     
     if countries is None:
         countries = SUPPORTED_COUNTRIES
@@ -191,12 +314,17 @@ def run_rfm_analysis_pipeline(
         'total_processing_time': 0
     }
     
-    for country in countries:
+    futures = {
+        country: run_rfm_analysis_task.submit(
+            country=country,
+            data_path=data_path
+        )
+        for country in countries
+    }
+    
+    for country, future in futures.items():
         try:
-            country_results = run_rfm_analysis(
-                country=country,
-                data_path=data_path
-            )
+            country_results = future.result()
             
             results['countries_processed'].append({
                 'country': country,
@@ -208,7 +336,7 @@ def run_rfm_analysis_pipeline(
         except Exception as e:
             logger.error(f"Failed RFM analysis for {country}: {str(e)}")
     
-    results['total_processing_time'] = time.time() - start_time
+    results['total_processing_time'] = time.monotonic() - start_time
     results['end_time'] = datetime.now().isoformat()
     
     return results
@@ -3,14 +3,165 @@ Data processing utilities for the ETL pipeline.
 Contains reusable functions for data cleaning, transformation, and validation.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from typing import Union, Dict, Any
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Union, Dict, Any, List, Optional
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
 
-def pad_customer_id(df: pd.DataFrame, column_name: str = "customer_id", width: int = 10) -> pd.DataFrame:
+# Age group boundaries (inclusive upper bounds) and labels
+AGE_GROUP_BINS = [-np.inf, 18, 30, 50, 65, np.inf]
+AGE_GROUP_LABELS = ["0-18", "19-30", "31-50", "51-65", "65+"]
+
+# Source mapping logic (simplified for demonstration)
+SOURCE_MAPPING = {
+    'amazon': 'Amazon',
+    'google': 'Google',
+    'newsletter': 'Newsletter',
+    'social': 'Social Media',
+    'offline': 'Offline'
+}
+
+# Channel type for each readable source name
+CHANNEL_TYPES = {
+    'Amazon': 'Online',
+    'Google': 'Online',
+    'Newsletter': 'Online',
+    'Social Media': 'Online',
+    'Offline': 'Offline'
+}
+
+# Salutation mapping
+SALUTATION_MAPPING = {
+    '1': 'Mr.',
+    '2': 'Ms.', 
+    '3': 'Mr./Ms.',
+    '4': 'Company',
+    '5': 'Company Address',
+    '6': 'Miss',
+    '7': 'Family',
+    'X': 'Diverse'
+}
+
+# Fixed categories for low-cardinality output columns, so frames built
+# separately (e.g. per country or per branch) concatenate as categoricals
+SOURCE_NAME_DTYPE = pd.CategoricalDtype([""] + list(SOURCE_MAPPING.values()))
+CHANNEL_TYPE_DTYPE = pd.CategoricalDtype(["", "Online", "Offline"])
+SALUTATION_DTYPE = pd.CategoricalDtype([""] + list(SALUTATION_MAPPING.values()))
+SALUTATION_CODES = pa.array(list(SALUTATION_MAPPING), pa.string())
+AGE_GROUP_DTYPE = pd.CategoricalDtype(["Unknown"] + AGE_GROUP_LABELS, ordered=True)
+CUSTOMER_SEGMENT_DTYPE = pd.CategoricalDtype([
+    "Unknown", "Champions", "Loyal Customers", "Potential Loyalists",
+    "New Customers", "At Risk", "Lost Customers"
+])
+
+
+def load_csv(filepath: Union[str, Path],
+             usecols: Optional[List[str]] = None,
+             parse_dates: Optional[List[str]] = None,
+             string_columns: Optional[List[str]] = None,
+             sep: str = ";",
+             encoding: str = "cp850",
+             block_size: int = 64 << 20) -> pd.DataFrame:
+    """
+    Load a delimited file with the multithreaded PyArrow CSV reader.
+    
+    Args:
+        filepath: Path to the CSV file
+        usecols: Columns to load (all columns if None)
+        parse_dates: Columns to parse as timestamps; invalid dates become NaT
+        string_columns: Columns to keep as text instead of inferring a type
+        sep: Field delimiter
+        encoding: File encoding, transcoded to UTF-8 while reading
+        block_size: Bytes per parse block handed to each reader thread
+        
+    Returns:
+        DataFrame with Arrow-backed string columns
+    """
+    read_options = pacsv.ReadOptions(
+        encoding=encoding,
+        block_size=block_size,
+        use_threads=True
+    )
+    parse_options = pacsv.ParseOptions(delimiter=sep)
+    # Date columns are read as text and parsed below, so a malformed value
+    # becomes NaT instead of failing the whole file
+    parse_dates = parse_dates or []
+    column_types = {col: pa.string() for col in [*(string_columns or []), *parse_dates]}
+    # Empty and NA-like fields load as missing values in every column,
+    # text included, as with pd.read_csv
+    convert_options = pacsv.ConvertOptions(
+        include_columns=usecols,
+        column_types=column_types,
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True
+    )
+    
+    table = pacsv.read_csv(
+        filepath,
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options
+    )
+    
+    # Keep text in Arrow memory; dates and numbers convert to NumPy dtypes
+    # so datetime arithmetic and boolean masks behave as with pd.read_csv
+    string_dtype = pd.StringDtype("pyarrow")
+    df = table.to_pandas(
+        types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get
+    )
+    for col in parse_dates:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format="ISO8601", errors="coerce", cache=True)
+    
+    return df
+
+
+def load_csvs(specs: Dict[str, Dict[str, Any]], max_workers: int = 4) -> Dict[str, pd.DataFrame]:
+    """
+    Load several independent CSV files concurrently.
+    
+    The PyArrow reader releases the GIL while parsing, so the files are
+    read and parsed in parallel threads.
+    
+    Args:
+        specs: Mapping of name to load_csv keyword arguments (including filepath)
+        max_workers: Maximum number of files read at once
+        
+    Returns:
+        Dictionary of DataFrames keyed like specs
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(load_csv, **kwargs) for name, kwargs in specs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def save_parquet(df: pd.DataFrame,
+                 filepath: Union[str, Path],
+                 compression: str = "snappy") -> None:
+    """
+    Write a DataFrame as a Parquet file.
+    
+    Args:
+        df: DataFrame to write
+        filepath: Output file path
+        compression: Parquet compression codec
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, filepath, compression=compression, use_dictionary=True)
+
+
+def pad_customer_id(df: pd.DataFrame,
+                    column_name: str = "customer_id",
+                    width: int = 10,
+                    copy: bool = False) -> pd.DataFrame:
     """
     Pad customer ID column with leading zeros and clean up formatting.
     
@@ -18,136 +169,166 @@ def pad_customer_id(df: pd.DataFrame, column_name: str = "customer_id", width: i
         df: DataFrame containing the ID column
         column_name: Name of the ID column to process
         width: Target width for zero-padding
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
         DataFrame with processed ID column
     """
-    df = df.copy()
-    df[column_name] = df[column_name].astype("string")
+    if copy:
+        df = df.copy()
+    ids = df[column_name]
+    
+    if pd.api.types.is_numeric_dtype(ids):
+        # Integer IDs format without a ".0" suffix in the first place
+        ids = pc.cast(pa.array(ids.astype("Int64"), from_pandas=True), pa.string())
+    else:
+        # Remove ".0" suffix if present
+        ids = pc.replace_substring(pc.cast(pa.array(ids, from_pandas=True), pa.string()), ".0", "")
     
-    # Remove ".0" suffix if present
-    df[column_name] = df[column_name].str.replace(".0", "", regex=False)
+    # Missing IDs become all zeros; pad the rest with leading zeros
+    ids = pc.utf8_lpad(pc.fill_null(ids, "0" * width), width, "0")
     
-    # Pad with leading zeros
-    df[column_name] = df[column_name].str.zfill(width)
+    df[column_name] = pd.Series(pd.arrays.ArrowStringArray(ids), index=df.index)
+    
+    return df
+
+
+def extract_customer_id(
+    df: pd.DataFrame,
+    reference_col: str = "customer_reference",
+    target_col: str = "customer_id",
+    start: int = 2,
+    stop: int = 12,
+    copy: bool = False
+) -> pd.DataFrame:
+    """
+    Extract the customer ID embedded in a transaction reference.
+    
+    Args:
+        df: DataFrame containing the reference column
+        reference_col: Name of the reference column
+        target_col: Name of the column to store the customer ID in
+        start: Start position of the customer ID in the reference
+        stop: End position (exclusive) of the customer ID in the reference
+        copy: Work on a copy instead of modifying df in place
+        
+    Returns:
+        DataFrame with customer ID column
+    """
+    if copy:
+        df = df.copy()
+    references = pc.cast(pa.array(df[reference_col], from_pandas=True), pa.string())
+    ids = pc.utf8_slice_codeunits(references, start, stop)
+    df[target_col] = pd.Series(pd.arrays.ArrowStringArray(ids), index=df.index)
     
     return df
 
 
-def calculate_age_groups(df: pd.DataFrame, birth_date_col: str = "birth_date") -> pd.DataFrame:
+def calculate_age_groups(df: pd.DataFrame,
+                         birth_date_col: str = "birth_date",
+                         copy: bool = False) -> pd.DataFrame:
     """
     Calculate age and assign age groups based on birth date.
     
     Args:
         df: DataFrame containing birth date information
         birth_date_col: Name of the birth date column
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
         DataFrame with added 'age' and 'age_group' columns
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     current_date = datetime.now()
     
     # Calculate age
-    df['age'] = df[birth_date_col].apply(
-        lambda x: current_date.year - x.year - 
-        ((current_date.month, current_date.day) < (x.month, x.day)) if pd.notna(x) else np.nan
-    )
-    
-    # Define age groups
-    def assign_age_group(age):
-        if pd.isna(age):
-            return "Unknown"
-        elif age <= 18:
-            return "0-18"
-        elif age <= 30:
-            return "19-30"
-        elif age <= 50:
-            return "31-50"
-        elif age <= 65:
-            return "51-65"
-        else:
-            return "65+"
-    
-    df['age_group'] = df['age'].apply(assign_age_group)
+    birth = df[birth_date_col]
+    if not pd.api.types.is_datetime64_any_dtype(birth):
+        birth = pd.to_datetime(birth, format="ISO8601", errors="coerce", cache=True)
+    year = birth.dt.year.to_numpy(dtype=float, na_value=np.nan)
+    month = birth.dt.month.to_numpy(dtype=float, na_value=np.nan)
+    day = birth.dt.day.to_numpy(dtype=float, na_value=np.nan)
+    # Compare (month, day) packed as MMDD; missing dates compare False and
+    # keep a NaN age
+    birthday_key = month * 100 + day
+    before_birthday = birthday_key > current_date.month * 100 + current_date.day
+    df['age'] = current_date.year - year - before_birthday
+    
+    # Assign age groups; ages are right-inclusive (18 is still "0-18") and
+    # missing ages (code -1) shift onto "Unknown"
+    age_bins = pd.cut(df['age'], bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS, right=True)
+    df['age_group'] = pd.Categorical.from_codes(age_bins.cat.codes + 1, dtype=AGE_GROUP_DTYPE)
     return df
 
 
-def assign_data_sources(df: pd.DataFrame, source_column: str) -> pd.DataFrame:
+def assign_data_sources(df: pd.DataFrame, source_column: str, copy: bool = False) -> pd.DataFrame:
     """
     Assign readable source names based on source codes.
     
     Args:
         df: DataFrame containing source information
         source_column: Name of the source code column
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
         DataFrame with added 'source_name' and 'channel_type' columns
     """
-    df = df.copy()
-    df["source_name"] = ""
-    df["channel_type"] = ""
-    
-    # Source mapping logic (simplified for demonstration)
-    source_mapping = {
-        'amazon': 'Amazon',
-        'google': 'Google',
-        'newsletter': 'Newsletter',
-        'social': 'Social Media',
-        'offline': 'Offline'
-    }
-    
-    # Apply source mapping (simplified logic)
-    for pattern, source_name in source_mapping.items():
-        mask = df[source_column].str.contains(pattern, case=False, na=False)
-        df.loc[mask, "source_name"] = source_name
+    if copy:
+        df = df.copy()
+    
+    # Apply source mapping (simplified logic); when several patterns match,
+    # the last one in SOURCE_MAPPING wins. Mapping entry i is category i + 1.
+    # Patterns are matched against the distinct codes only, then spread to
+    # the rows through the dictionary indices
+    encoded = pa.array(df[source_column].astype("string[pyarrow]")).dictionary_encode()
+    matches = [
+        pc.match_substring(encoded.dictionary, pattern, ignore_case=True).to_numpy(zero_copy_only=False)
+        for pattern in SOURCE_MAPPING
+    ]
+    value_categories = np.select(
+        matches[::-1], np.arange(len(matches), 0, -1, dtype=np.int8), default=0
+    )
+    # Missing codes point one past the dictionary, at category 0
+    value_categories = np.append(value_categories, 0).astype(np.int8)
+    indices = pc.fill_null(encoded.indices, len(encoded.dictionary)).to_numpy()
+    category_codes = value_categories[indices]
+    df["source_name"] = pd.Categorical.from_codes(category_codes, dtype=SOURCE_NAME_DTYPE)
     
     # Assign channel type
-    online_sources = ['Amazon', 'Google', 'Newsletter', 'Social Media']
-    df.loc[df["source_name"].isin(online_sources), "channel_type"] = "Online"
-    df.loc[df["source_name"].isin(['Offline']), "channel_type"] = "Offline"
+    df["channel_type"] = df["source_name"].map(CHANNEL_TYPES).fillna("")
+    df["channel_type"] = df["channel_type"].astype(CHANNEL_TYPE_DTYPE)
     
     return df
 
 
-def process_salutation(df: pd.DataFrame, salutation_col: str = "salutation") -> pd.DataFrame:
+def process_salutation(df: pd.DataFrame,
+                       salutation_col: str = "salutation",
+                       copy: bool = False) -> pd.DataFrame:
     """
     Process and standardize salutation values.
     
     Args:
         df: DataFrame containing salutation information
         salutation_col: Name of the salutation column
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
         DataFrame with processed salutation column
     """
-    df = df.copy()
-    
-    # Salutation mapping
-    salutation_mapping = {
-        '1': 'Mr.',
-        '2': 'Ms.', 
-        '3': 'Mr./Ms.',
-        '4': 'Company',
-        '5': 'Company Address',
-        '6': 'Miss',
-        '7': 'Family',
-        'X': 'Diverse'
-    }
+    if copy:
+        df = df.copy()
     
-    def clean_salutation(value):
-        if pd.isna(value):
-            return ""
-        value = str(value)
-        # Remove leading zeros and .0 suffix
-        if value.startswith('0'):
-            value = value.lstrip('0')
-        if value.endswith('.0'):
-            value = value[:-2]
-        return value
+    # Remove .0 suffix and leading zeros
+    codes = pc.cast(pa.array(df[salutation_col], from_pandas=True), pa.string())
+    codes = pc.replace_substring_regex(codes, r"\.0$", "")
+    codes = pc.utf8_ltrim(codes, "0")
     
-    df[salutation_col] = df[salutation_col].apply(clean_salutation)
-    df[salutation_col] = df[salutation_col].map(salutation_mapping).fillna("")
+    # Position of each code among the mapping keys is its category code
+    # (shifted past the leading ""); unknown codes fall back to ""
+    positions = pc.index_in(codes, value_set=SALUTATION_CODES)
+    category_codes = pc.fill_null(pc.add(positions, 1), 0).to_numpy().astype(np.int8)
+    df[salutation_col] = pd.Categorical.from_codes(category_codes, dtype=SALUTATION_DTYPE)
     
     return df
 
@@ -156,28 +337,37 @@ def calculate_net_sales(df: pd.DataFrame,
                        gross_amount_col: str = "gross_amount",
                        tax1_col: str = "tax1", 
                        tax2_col: str = "tax2",
-                       tax3_col: str = "tax3") -> pd.DataFrame:
+                       tax3_col: str = "tax3",
+                       net_amount_col: str = "net_amount",
+                       copy: bool = False) -> pd.DataFrame:
     """
     Calculate net sales amount by subtracting taxes from gross amount.
     
+    Missing taxes count as zero.
+    
     Args:
         df: DataFrame containing sales and tax information
         gross_amount_col: Name of the gross amount column
         tax1_col: Name of the first tax column
         tax2_col: Name of the second tax column  
         tax3_col: Name of the third tax column
+        net_amount_col: Name of the column to store the net amount in
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
-        DataFrame with added 'net_amount' column
+        DataFrame with added net amount column
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
-    df["net_amount"] = (
-        df[gross_amount_col] 
-        - df[tax1_col].fillna(0) 
-        - df[tax2_col].fillna(0) 
-        - df[tax3_col].fillna(0)
-    )
+    taxes = df[[tax1_col, tax2_col, tax3_col]].to_numpy(dtype=float, na_value=0.0)
+    net_amount = df[gross_amount_col].to_numpy(dtype=float, na_value=np.nan, copy=True)
+    
+    # Subtract in column order, in place, so results match gross - tax1 - tax2 - tax3
+    for i in range(taxes.shape[1]):
+        np.subtract(net_amount, taxes[:, i], out=net_amount)
+    
+    df[net_amount_col] = net_amount
     
     return df
 
@@ -208,13 +398,16 @@ def get_half_year_reference_dates(today: date = None) -> tuple[date, date, date]
     return five_years_ago_start, two_years_ago_start, today
 
 
-def validate_data_quality(df: pd.DataFrame, required_columns: list) -> Dict[str, Any]:
+def validate_data_quality(df: pd.DataFrame, required_columns: list,
+                          dup_subset: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Perform basic data quality checks on a DataFrame.
     
     Args:
         df: DataFrame to validate
         required_columns: List of required column names
+        dup_subset: Key columns identifying a row; duplicates are checked on
+            these only instead of on every column
         
     Returns:
         Dictionary containing validation results
@@ -231,12 +424,11 @@ def validate_data_quality(df: pd.DataFrame, required_columns: list) -> Dict[str,
     results['missing_columns'] = missing_cols
     
     # Check for null values in required columns
-    for col in required_columns:
-        if col in df.columns:
-            results['null_counts'][col] = df[col].isnull().sum()
+    present_cols = [col for col in required_columns if col in df.columns]
+    results['null_counts'] = df[present_cols].isna().sum().to_dict()
     
     # Check for duplicate rows
-    results['duplicate_rows'] = df.duplicated().sum()
+    results['duplicate_rows'] = df.duplicated(subset=dup_subset).sum()
     
     return results
 
@@ -251,13 +443,14 @@ def safe_string_operations(series: pd.Series) -> pd.Series:
     Returns:
         Series with safe string operations applied
     """
-    return series.astype("string").fillna("")
+    return series.astype("string[pyarrow]").fillna("")
 
 
 def create_customer_segments(df: pd.DataFrame, 
                            recency_col: str = "recency",
                            frequency_col: str = "frequency", 
-                           monetary_col: str = "monetary") -> pd.DataFrame:
+                           monetary_col: str = "monetary",
+                           copy: bool = False) -> pd.DataFrame:
     """
     Create customer segments based on RFM analysis.
     
@@ -266,31 +459,33 @@ def create_customer_segments(df: pd.DataFrame,
         recency_col: Name of the recency score column
         frequency_col: Name of the frequency score column
         monetary_col: Name of the monetary score column
+        copy: Work on a copy instead of modifying df in place
         
     Returns:
         DataFrame with added 'customer_segment' column
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
+    
+    r = df[recency_col].to_numpy(dtype=float, na_value=np.nan)
+    f = df[frequency_col].to_numpy(dtype=float, na_value=np.nan)
+    m = df[monetary_col].to_numpy(dtype=float, na_value=np.nan)
+    
+    # Simple segmentation logic; the first matching condition wins
+    conditions = [
+        np.isnan(r) | np.isnan(f) | np.isnan(m),
+        (r >= 4) & (f >= 4) & (m >= 4),
+        (r >= 3) & (f >= 3) & (m >= 3),
+        (r >= 2) & (f >= 2),
+        (r >= 3) & (f <= 2),
+        (r <= 2) & (f >= 3)
+    ]
+    # Choices are codes into CUSTOMER_SEGMENT_DTYPE; "Lost Customers" is last
+    codes = np.select(
+        conditions,
+        np.arange(len(conditions), dtype=np.int8),
+        default=len(conditions)
+    )
     
-    def assign_segment(row):
-        r, f, m = row[recency_col], row[frequency_col], row[monetary_col]
-        
-        if pd.isna(r) or pd.isna(f) or pd.isna(m):
-            return "Unknown"
-        
-        # Simple segmentation logic
-        if r >= 4 and f >= 4 and m >= 4:
-            return "Champions"
-        elif r >= 3 and f >= 3 and m >= 3:
-            return "Loyal Customers"
-        elif r >= 2 and f >= 2:
-            return "Potential Loyalists"
-        elif r >= 3 and f <= 2:
-            return "New Customers"
-        elif r <= 2 and f >= 3:
-            return "At Risk"
-        else:
-            return "Lost Customers"
-    
-    df['customer_segment'] = df.apply(assign_segment, axis=1)
+    df['customer_segment'] = pd.Categorical.from_codes(codes, dtype=CUSTOMER_SEGMENT_DTYPE)
     return df
@@ -10,7 +10,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date
 from src.utils.data_processing import (
+    load_csv,
     pad_customer_id,
+    extract_customer_id,
     calculate_age_groups,
     assign_data_sources,
     process_salutation,
@@ -41,9 +43,21 @@ class TestDataProcessing:
         result = pad_customer_id(df, 'customer_id', 10)
         
         # Assertions
-        pd.testing.assert_frame_equal(result, expected)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
         assert all(len(str(id)) == 10 for id in result['customer_id'])
     
+    def test_extract_customer_id(self):
+        """Test customer ID extraction from transaction references."""
+        df = pd.DataFrame({
+            'customer_reference': ['AB0000000123XY', 'CD0000004567', None]
+        })
+        
+        result = extract_customer_id(df)
+        
+        assert result['customer_id'].tolist()[:2] == ['0000000123', '0000004567']
+        assert pd.isna(result['customer_id'].iloc[2])
+        assert 'customer_reference' in result.columns
+    
     def test_calculate_age_groups(self):
         """Test age group calculation."""
         # Test data
@@ -90,6 +104,17 @@ class TestDataProcessing:
         assert result['source_name'].iloc[3] == 'Social Media'
         assert result['source_name'].iloc[4] == 'Offline'
     
+    def test_assign_data_sources_precedence(self):
+        """Test that the last matching source pattern wins."""
+        df = pd.DataFrame({
+            'source_code': ['googlenewsletter', 'AMAZON_offline', None, 'unknown', 'googlenewsletter']
+        })
+        
+        result = assign_data_sources(df, 'source_code')
+        
+        assert result['source_name'].tolist() == ['Newsletter', 'Offline', '', '', 'Newsletter']
+        assert result['channel_type'].tolist() == ['Online', 'Offline', '', '', 'Online']
+    
     def test_process_salutation(self):
         """Test salutation processing."""
         # Test data
@@ -134,7 +159,7 @@ class TestDataProcessing:
         required_columns = ['customer_id', 'name', 'age']
         
         # Test function
-        result = validate_data_quality(df, required_columns)
+        result = validate_data_quality(df, required_columns, dup_subset=['customer_id'])
         
         # Assertions
         assert result['total_rows'] == 4
@@ -158,6 +183,22 @@ class TestDataProcessing:
         assert 'customer_segment' in result.columns
         assert result['customer_segment'].iloc[0] == 'Champions'  # High R, F, M
         assert result['customer_segment'].iloc[4] == 'Lost Customers'  # Low R, F, M
+    
+    def test_categorical_output_dtypes(self):
+        """Test that low-cardinality outputs are stored as categoricals."""
+        df = pd.DataFrame({
+            'birth_date': ['1990-01-01', None],
+            'recency': [5, 1],
+            'frequency': [5, 1],
+            'monetary': [5, 1]
+        })
+        
+        result = calculate_age_groups(df, 'birth_date')
+        result = create_customer_segments(result, 'recency', 'frequency', 'monetary')
+        
+        assert isinstance(result['age_group'].dtype, pd.CategoricalDtype)
+        assert isinstance(result['customer_segment'].dtype, pd.CategoricalDtype)
+        assert result['age_group'].tolist()[1] == 'Unknown'
 
 
 class TestDataValidation:
@@ -191,6 +232,24 @@ class TestDataValidation:
 class TestEdgeCases:
     """Test cases for edge cases and error handling."""
     
+    def test_load_csv_blank_string_fields(self, tmp_path):
+        """Test that blank text fields load as missing, like pd.read_csv."""
+        filepath = tmp_path / "orders.csv"
+        filepath.write_text(
+            'customer_id;order_number;email_type\n'
+            '123;A1;news\n'
+            '456;;\n'
+            '789;"";""\n',
+            encoding="cp850"
+        )
+        
+        result = load_csv(filepath, string_columns=['customer_id', 'order_number'])
+        expected = pd.read_csv(filepath, sep=';', encoding='cp850', dtype=str)
+        
+        assert result['order_number'].isna().tolist() == [False, True, True]
+        assert result['email_type'].isna().tolist() == [False, True, True]
+        pd.testing.assert_frame_equal(result.isna(), expected.isna())
+    
     def test_nan_values_in_customer_id(self):
         """Test handling of NaN values in customer ID."""
         df = pd.DataFrame({
@@ -204,6 +263,24 @@ class TestEdgeCases:
         assert len(result) == 3
         assert result['customer_id'].iloc[1] == '0000000000'  # NaN becomes 0
     
+    def test_load_csv_invalid_dates(self, tmp_path):
+        """Test that malformed dates in a date column load as NaT."""
+        filepath = tmp_path / "transactions.csv"
+        filepath.write_text(
+            'customer_id;transaction_date\n'
+            '123;2020-01-02\n'
+            '456;31.12.2020\n'
+            '789;\n'
+            '012;2020-01-02 10:00:00\n',
+            encoding="cp850"
+        )
+        
+        result = load_csv(filepath, parse_dates=['transaction_date'])
+        
+        assert pd.api.types.is_datetime64_any_dtype(result['transaction_date'])
+        assert result['transaction_date'].isna().tolist() == [False, True, True, False]
+        assert result['transaction_date'].iloc[3] == pd.Timestamp('2020-01-02 10:00:00')
+    
     def test_invalid_dates(self):
         """Test handling of invalid dates in age calculation."""
         df = pd.DataFrame({
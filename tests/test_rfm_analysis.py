@@ -0,0 +1,131 @@
+"""
+Test cases for the RFM analysis pipeline.
+
+This module checks the RFM metric calculations against plain pandas
+groupby references.
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from prefect.logging import disable_run_logger
+from src.analytics.rfm_analysis import calculate_rfm_metrics
+
+
+FIVE_YEARS_AGO = pd.Timestamp("2020-01-01")
+TWO_YEARS_AGO = pd.Timestamp("2023-01-01")
+TODAY = pd.Timestamp("2025-03-15")
+
+
+@pytest.fixture
+def merged_data():
+    """Merged RFM rows with repeated and missing orders and customers without transactions."""
+    rng = np.random.default_rng(0)
+    n = 400
+    customer_id = pd.Series(
+        [f"{i:010d}" for i in rng.integers(1, 60, n)], dtype="string[pyarrow]"
+    )
+    order_number = pd.Series(
+        [f"ORD{i}" for i in rng.integers(0, 150, n)], dtype="string[pyarrow]"
+    )
+    order_number[rng.random(n) < 0.1] = pd.NA
+    transaction_date = pd.Series(
+        pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2800, n), unit="D")
+    )
+    net_sales = pd.Series(rng.uniform(5, 500, n).round(2) - 0.5)
+    email_type = pd.Series(rng.choice(["newsletter", "promotional"], n), dtype="string[pyarrow]")
+    email_type[rng.random(n) < 0.5] = pd.NA
+
+    data = pd.DataFrame({
+        'customer_id': customer_id,
+        'registration_date': pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3000, n), unit="D"),
+        'email_type': email_type,
+        'order_number': order_number,
+        'net_sales': net_sales,
+        'transaction_date': transaction_date
+    })
+
+    # Customers without transactions, as left by the address join
+    no_transactions = pd.DataFrame({
+        'customer_id': pd.Series(["0000000998", "0000000999"], dtype="string[pyarrow]"),
+        'registration_date': pd.to_datetime(["2016-05-01", pd.NaT]),
+        'email_type': pd.Series([pd.NA, "newsletter"], dtype="string[pyarrow]"),
+        'order_number': pd.Series([pd.NA, pd.NA], dtype="string[pyarrow]"),
+        'net_sales': [np.nan, np.nan],
+        'transaction_date': pd.to_datetime([pd.NaT, pd.NaT])
+    })
+    return pd.concat([data, no_transactions], ignore_index=True)
+
+
+def _period_reference(data: pd.DataFrame, start, end, freq_col: str, monetary_col: str) -> pd.DataFrame:
+    in_period = (data['transaction_date'] >= start) & (data['transaction_date'] < end)
+    return (
+        data[in_period].groupby("customer_id", as_index=False)
+        .agg({'order_number': 'nunique', 'net_sales': 'sum'})
+        .rename(columns={'order_number': freq_col, 'net_sales': monetary_col})
+    )
+
+
+class TestRFMMetrics:
+    """Test cases for RFM metric calculation."""
+
+    def test_customer_metrics_match_groupby(self, merged_data):
+        """Test customer-level metrics against a groupby reference."""
+        expected = (
+            merged_data.groupby("customer_id", as_index=False)
+            .agg({
+                'email_type': 'first',
+                'registration_date': 'first',
+                'order_number': 'nunique',
+                'net_sales': 'sum',
+                'transaction_date': 'max'
+            })
+            .rename(columns={
+                'order_number': 'frequency',
+                'net_sales': 'monetary',
+                'transaction_date': 'recency'
+            })
+        )
+
+        with disable_run_logger():
+            result, _, _ = calculate_rfm_metrics.fn(merged_data, FIVE_YEARS_AGO, TWO_YEARS_AGO, TODAY)
+
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=True)
+        assert result.loc[result['customer_id'] == "0000000998", 'frequency'].item() == 0
+        assert result['frequency'].dtype == np.int32
+        assert pd.isna(result.loc[result['customer_id'] == "0000000999", 'recency'].item())
+
+    def test_period_metrics_match_groupby(self, merged_data):
+        """Test per-period metrics against groupbys on the period rows."""
+        with disable_run_logger():
+            _, metrics_3to5, metrics_last2 = calculate_rfm_metrics.fn(
+                merged_data, FIVE_YEARS_AGO, TWO_YEARS_AGO, TODAY
+            )
+
+        expected_3to5 = _period_reference(
+            merged_data, FIVE_YEARS_AGO, TWO_YEARS_AGO, 'freq_3to5_years', 'monetary_3to5_years'
+        )
+        expected_last2 = _period_reference(
+            merged_data, TWO_YEARS_AGO, TODAY, 'freq_last_2_years', 'monetary_last_2_years'
+        )
+
+        pd.testing.assert_frame_equal(metrics_3to5, expected_3to5, check_dtype=False, check_exact=True)
+        pd.testing.assert_frame_equal(metrics_last2, expected_last2, check_dtype=False, check_exact=True)
+        assert metrics_3to5['freq_3to5_years'].dtype == np.int32
+        assert metrics_last2['freq_last_2_years'].dtype == np.int32
+
+    def test_accepts_plain_dates(self, merged_data):
+        """Test that the date objects passed by the flow give the same metrics as timestamps."""
+        with disable_run_logger():
+            expected = calculate_rfm_metrics.fn(merged_data, FIVE_YEARS_AGO, TWO_YEARS_AGO, TODAY)
+            result = calculate_rfm_metrics.fn(
+                merged_data, FIVE_YEARS_AGO.date(), TWO_YEARS_AGO.date(), TODAY.date()
+            )
+
+        for result_frame, expected_frame in zip(result, expected):
+            pd.testing.assert_frame_equal(result_frame, expected_frame)
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])